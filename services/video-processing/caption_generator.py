@@ -1,16 +1,17 @@
 """
-Caption Generator using OpenAI Whisper API
+Caption Generator using a pluggable transcription backend
 Generates subtitles/captions in Mongolian and English
 """
 
 import subprocess
 import tempfile
 import os
+import asyncio
 from pathlib import Path
 from typing import Optional
 import json
 
-from openai import OpenAI
+from transcription import TranscriptionBackend, TranscriptionError, create_backend, get_backend
 
 
 def extract_audio(input_path: str, output_path: str) -> bool:
@@ -67,14 +68,15 @@ def generate_vtt(segments: list, output_path: str) -> None:
             f.write(f"{text}\n\n")
 
 
-def generate_captions(
+async def generate_captions(
     input_path: str,
     output_dir: str,
     language: Optional[str] = None,
-    model_size: str = "base"
+    model_size: str = "base",
+    backend: Optional[TranscriptionBackend] = None
 ) -> dict:
     """
-    Generate captions for a video file using OpenAI Whisper API.
+    Generate captions for a video file using the transcription backend.
 
     Args:
         input_path: Path to input video file
@@ -82,24 +84,25 @@ def generate_captions(
         language: Language code (e.g., 'mn' for Mongolian, 'en' for English)
                   If None, Whisper will auto-detect
         model_size: Ignored (API uses whisper-1 model)
+        backend: Transcription backend (defaults to the shared process backend)
 
     Returns:
         Dictionary with paths to generated caption files
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    try:
+        backend = backend or get_backend()
+    except TranscriptionError as e:
         return {
             "success": False,
-            "error": "OPENAI_API_KEY environment variable not set"
+            "error": str(e)
         }
 
-    client = OpenAI(api_key=api_key)
     os.makedirs(output_dir, exist_ok=True)
 
     with tempfile.TemporaryDirectory() as temp_dir:
         # Extract audio as mp3 (smaller file size for API)
         audio_path = os.path.join(temp_dir, "audio.mp3")
-        if not extract_audio(input_path, audio_path):
+        if not await asyncio.to_thread(extract_audio, input_path, audio_path):
             return {
                 "success": False,
                 "error": "Failed to extract audio from video"
@@ -113,24 +116,16 @@ def generate_captions(
                 "error": f"Audio file too large ({file_size / 1024 / 1024:.1f}MB). Max is 25MB."
             }
 
-        print("Transcribing audio with OpenAI Whisper API...")
+        print(f"Transcribing audio with {backend.name} backend...")
 
-        # Transcribe using OpenAI API
-        with open(audio_path, "rb") as audio_file:
-            transcribe_options = {
-                "model": "whisper-1",
-                "file": audio_file,
-                "response_format": "verbose_json",
-                "timestamp_granularities": ["segment"]
+        try:
+            result_dict = await backend.transcribe(audio_path, language=language)
+        except TranscriptionError as e:
+            return {
+                "success": False,
+                "error": f"Transcription failed: {e}"
             }
 
-            if language:
-                transcribe_options["language"] = language
-
-            result = client.audio.transcriptions.create(**transcribe_options)
-
-        # Convert response to dict
-        result_dict = result.model_dump()
         detected_language = result_dict.get("language", "unknown")
         segments = result_dict.get("segments", [])
         full_text = result_dict.get("text", "")
@@ -168,10 +163,11 @@ def generate_captions(
         }
 
 
-def generate_bilingual_captions(
+async def generate_bilingual_captions(
     input_path: str,
     output_dir: str,
-    model_size: str = "base"
+    model_size: str = "base",
+    backend: Optional[TranscriptionBackend] = None
 ) -> dict:
     """
     Generate captions in both Mongolian and English.
@@ -184,25 +180,28 @@ def generate_bilingual_captions(
         input_path: Path to input video file
         output_dir: Directory to save caption files
         model_size: Ignored (API uses whisper-1)
+        backend: Transcription backend (defaults to the shared process backend)
 
     Returns:
         Dictionary with paths to generated caption files
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    try:
+        backend = backend or get_backend()
+    except TranscriptionError as e:
         return {
             "success": False,
-            "error": "OPENAI_API_KEY environment variable not set"
+            "error": str(e)
         }
 
     results = {}
 
     # First, detect language and generate original captions
-    original_result = generate_captions(
+    original_result = await generate_captions(
         input_path,
         output_dir,
         language=None,  # Auto-detect
-        model_size=model_size
+        model_size=model_size,
+        backend=backend
     )
 
     if not original_result.get("success"):
@@ -215,43 +214,52 @@ def generate_bilingual_captions(
     if detected_language == "mn" or detected_language == "mongolian":
         print("Generating English translation...")
 
-        client = OpenAI(api_key=api_key)
-
         with tempfile.TemporaryDirectory() as temp_dir:
             audio_path = os.path.join(temp_dir, "audio.mp3")
-            extract_audio(input_path, audio_path)
+            await asyncio.to_thread(extract_audio, input_path, audio_path)
 
             # Use translation endpoint for English translation
-            with open(audio_path, "rb") as audio_file:
-                result = client.audio.translations.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="verbose_json",
-                    timestamp_granularities=["segment"]
-                )
-
-            result_dict = result.model_dump()
-            segments = result_dict.get("segments", [])
-
-            base_name = Path(input_path).stem
-            srt_path = os.path.join(output_dir, f"{base_name}_en_translated.srt")
-            vtt_path = os.path.join(output_dir, f"{base_name}_en_translated.vtt")
-
-            generate_srt(segments, srt_path)
-            generate_vtt(segments, vtt_path)
-
-            results["english_translation"] = {
-                "success": True,
-                "srt_path": srt_path,
-                "vtt_path": vtt_path,
-                "full_text": result_dict.get("text", ""),
-                "segment_count": len(segments)
-            }
+            try:
+                result_dict = await backend.translate(audio_path)
+            except TranscriptionError as e:
+                results["english_translation"] = {
+                    "success": False,
+                    "error": f"Translation failed: {e}"
+                }
+            else:
+                segments = result_dict.get("segments", [])
+
+                base_name = Path(input_path).stem
+                srt_path = os.path.join(output_dir, f"{base_name}_en_translated.srt")
+                vtt_path = os.path.join(output_dir, f"{base_name}_en_translated.vtt")
+
+                generate_srt(segments, srt_path)
+                generate_vtt(segments, vtt_path)
+
+                results["english_translation"] = {
+                    "success": True,
+                    "srt_path": srt_path,
+                    "vtt_path": vtt_path,
+                    "full_text": result_dict.get("text", ""),
+                    "segment_count": len(segments)
+                }
 
     results["success"] = True
     return results
 
 
+async def _run_cli(input_path: str, output_dir: str, language: Optional[str]) -> dict:
+    try:
+        backend = create_backend()
+    except TranscriptionError as e:
+        return {"success": False, "error": str(e)}
+
+    try:
+        return await generate_captions(input_path, output_dir, language=language, backend=backend)
+    finally:
+        await backend.aclose()
+
+
 if __name__ == "__main__":
     import sys
 
@@ -264,5 +272,5 @@ if __name__ == "__main__":
     output_directory = sys.argv[2]
     lang = sys.argv[3] if len(sys.argv) > 3 else None
 
-    result = generate_captions(input_file, output_directory, language=lang)
+    result = asyncio.run(_run_cli(input_file, output_directory, lang))
     print(f"Result: {json.dumps(result, indent=2)}")
@@ -0,0 +1,97 @@
+"""
+Stage Checkpoints
+Records completed pipeline stages so an interrupted job resumes instead of restarting
+
+Each job directory holds a `checkpoint.json` manifest. A stage entry stores
+the stage's result data plus SHA-256 hashes of the files it produced; on
+resume a stage only counts as done if every earlier stage does too and its
+artifacts are still on disk with matching hashes.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Optional
+
+
+MANIFEST_NAME = "checkpoint.json"
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Checkpoint manifest for one job directory."""
+
+    def __init__(self, job_dir: str, stages: list[str]):
+        self.job_dir = job_dir
+        self.stages = stages
+        self.path = os.path.join(job_dir, MANIFEST_NAME)
+        self.manifest = {"stages": {}}
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {"stages": {}}
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _is_valid(self, entry: dict) -> bool:
+        for rel_path, expected in entry.get("artifacts", {}).items():
+            path = os.path.join(self.job_dir, rel_path)
+            if not os.path.exists(path) or hash_file(path) != expected:
+                return False
+        return True
+
+    def _restore(self) -> dict:
+        self._load()
+        completed = {}
+        for stage in self.stages:
+            entry = self.manifest["stages"].get(stage)
+            if entry is None or not self._is_valid(entry):
+                break
+            completed[stage] = entry.get("data", {})
+        return completed
+
+    def _record(self, stage: str, artifacts: list[str], data: dict) -> None:
+        # Redoing a stage invalidates everything after it
+        later = self.stages[self.stages.index(stage) + 1:]
+        for name in later:
+            self.manifest["stages"].pop(name, None)
+
+        self.manifest["stages"][stage] = {
+            "completed_at": time.time(),
+            "artifacts": {
+                os.path.relpath(path, self.job_dir): hash_file(path)
+                for path in artifacts
+            },
+            # Snapshot, so later changes by the caller don't leak into the manifest
+            "data": json.loads(json.dumps(data))
+        }
+        self._save()
+
+    async def restore(self) -> dict:
+        """
+        Return {stage: data} for the leading run of valid completed stages.
+        """
+        return await asyncio.to_thread(self._restore)
+
+    async def record(self, stage: str, artifacts: Optional[list[str]] = None, data: Optional[dict] = None) -> None:
+        """Mark a stage complete, hashing the files it produced."""
+        await asyncio.to_thread(self._record, stage, artifacts or [], data or {})
@@ -0,0 +1,662 @@
+"""
+Job State Store
+Shared job status and queue so any process can serve /status and claim work
+
+Backends:
+- memory: process-local dict (single process only)
+- sqlite: SQLite database in WAL mode, shared by all processes on one host
+- redis: any Redis-protocol server, shared by processes on many nodes
+
+Claimed jobs hold a lease that the worker renews with `heartbeat`. If a
+worker dies, its lease expires and the job can be claimed again, so another
+worker resumes it from its last checkpoint (see checkpoint.py).
+
+Finished jobs are evicted by age and count (`prune`), and large results are
+kept on disk by ResultStore so the job store only holds a small reference.
+"""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import sqlite3
+from collections import deque
+from contextlib import closing
+from typing import Optional
+
+import aiofiles
+
+
+JOB_FIELDS = ("status", "progress", "message", "result")
+SUMMARY_FIELDS = ("status", "progress", "message", "created_at", "updated_at")
+FINISHED_STATUSES = ("completed", "failed")
+RESULT_REF_KEY = "$ref"
+
+
+def _new_job(job_id: str) -> dict:
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "progress": 0,
+        "message": "Job queued",
+        "result": None
+    }
+
+
+class JobStore:
+    """
+    Base class for job stores.
+
+    Jobs are plain dicts with the JobStatus fields. `create` queues a job,
+    `claim` hands each queued job to exactly one worker.
+    """
+
+    name = "base"
+
+    async def create(self, job_id: str, payload: dict) -> dict:
+        """Store a new pending job and queue it for processing."""
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Return the job status, or None if the job does not exist."""
+        raise NotImplementedError
+
+    async def update(self, job_id: str, **fields) -> None:
+        """Update status fields (status, progress, message, result) of a job."""
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str, lease: float = 60.0) -> Optional[dict]:
+        """
+        Atomically take the oldest queued job, or an unfinished job whose
+        lease has expired, and lease it to `worker_id` for `lease` seconds.
+
+        Returns a dict with `job_id` and the `payload` given to `create`,
+        or None if there is nothing to claim.
+        """
+        raise NotImplementedError
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease: float = 60.0) -> bool:
+        """Extend the lease on a claimed job. Returns False if the worker no longer holds it."""
+        raise NotImplementedError
+
+    async def list_jobs(self, offset: int = 0, limit: int = 20) -> tuple[list[dict], int]:
+        """
+        Return a page of job summaries (newest first) and the total job count.
+
+        Summaries carry status fields and timestamps but never the result.
+        """
+        raise NotImplementedError
+
+    async def prune(self, max_age: Optional[float] = None, max_jobs: Optional[int] = None) -> list[str]:
+        """
+        Evict finished jobs older than `max_age` seconds, and the oldest
+        finished jobs beyond the newest `max_jobs`. Returns the evicted ids.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections held by the store."""
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """In-process store. Only correct when the service runs as a single process."""
+
+    name = "memory"
+
+    def __init__(self):
+        self.jobs: dict[str, dict] = {}
+        self.payloads: dict[str, dict] = {}
+        self.queue: deque[str] = deque()
+        self.leases: dict[str, tuple[str, float]] = {}
+
+    async def create(self, job_id: str, payload: dict) -> dict:
+        job = _new_job(job_id)
+        now = time.time()
+        self.jobs[job_id] = {**job, "created_at": now, "updated_at": now}
+        self.payloads[job_id] = payload
+        self.queue.append(job_id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {"job_id": job_id, **{k: job[k] for k in JOB_FIELDS}}
+
+    async def update(self, job_id: str, **fields) -> None:
+        if job_id in self.jobs:
+            self.jobs[job_id].update({k: v for k, v in fields.items() if k in JOB_FIELDS})
+            self.jobs[job_id]["updated_at"] = time.time()
+            if fields.get("status") in FINISHED_STATUSES:
+                self.leases.pop(job_id, None)
+
+    async def claim(self, worker_id: str, lease: float = 60.0) -> Optional[dict]:
+        now = time.time()
+        expired = [job_id for job_id, (_, expires) in self.leases.items() if expires < now]
+        if expired:
+            job_id = expired[0]
+        elif self.queue:
+            job_id = self.queue.popleft()
+        else:
+            return None
+        self.leases[job_id] = (worker_id, now + lease)
+        return {"job_id": job_id, "payload": self.payloads.get(job_id, {})}
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease: float = 60.0) -> bool:
+        holder = self.leases.get(job_id)
+        if holder is None or holder[0] != worker_id:
+            return False
+        self.leases[job_id] = (worker_id, time.time() + lease)
+        return True
+
+    async def list_jobs(self, offset: int = 0, limit: int = 20) -> tuple[list[dict], int]:
+        # Dicts keep insertion order, so reversed() is newest first
+        page = []
+        for i, job_id in enumerate(reversed(self.jobs)):
+            if i >= offset + limit:
+                break
+            if i >= offset:
+                job = self.jobs[job_id]
+                page.append({"job_id": job_id, **{k: job[k] for k in SUMMARY_FIELDS}})
+        return page, len(self.jobs)
+
+    async def prune(self, max_age: Optional[float] = None, max_jobs: Optional[int] = None) -> list[str]:
+        finished = sorted(
+            (job["updated_at"], job_id)
+            for job_id, job in self.jobs.items()
+            if job["status"] in FINISHED_STATUSES
+        )
+        evicted = set()
+        if max_age:
+            cutoff = time.time() - max_age
+            evicted.update(job_id for updated_at, job_id in finished if updated_at < cutoff)
+        if max_jobs and len(finished) > max_jobs:
+            evicted.update(job_id for _, job_id in finished[:len(finished) - max_jobs])
+
+        for job_id in evicted:
+            self.jobs.pop(job_id, None)
+            self.payloads.pop(job_id, None)
+            self.leases.pop(job_id, None)
+        return list(evicted)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    SQLite store for several processes on one host.
+
+    WAL mode lets readers (/status) run alongside the writer. Claims run in
+    an IMMEDIATE transaction, so two workers can never take the same job.
+    Leases are stored as an expiry timestamp on the job row.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL,
+                    message TEXT NOT NULL,
+                    result TEXT,
+                    payload TEXT NOT NULL,
+                    claimed_by TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (claimed_by, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        return {
+            "job_id": row["job_id"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"],
+            "result": json.loads(row["result"]) if row["result"] else None
+        }
+
+    def _create(self, job_id: str, payload: dict) -> dict:
+        job = _new_job(job_id)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, progress, message, result, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?, ?, ?)",
+                (job_id, job["status"], job["progress"], job["message"], json.dumps(payload), now, now)
+            )
+        return job
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def _update(self, job_id: str, fields: dict) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"]) if fields["result"] is not None else None
+        columns = [f for f in JOB_FIELDS if f in fields]
+        if not columns:
+            return
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+                (*(fields[c] for c in columns), time.time(), job_id)
+            )
+
+    def _claim(self, worker_id: str, lease: float) -> Optional[dict]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT job_id, payload FROM jobs "
+                f"WHERE claimed_by IS NULL OR (lease_expires < ? AND status NOT IN ({', '.join('?' for _ in FINISHED_STATUSES)})) "
+                "ORDER BY created_at LIMIT 1",
+                (now, *FINISHED_STATUSES)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET claimed_by = ?, lease_expires = ?, updated_at = ? WHERE job_id = ?",
+                (worker_id, now + lease, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+            return {"job_id": row["job_id"], "payload": json.loads(row["payload"])}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _heartbeat(self, job_id: str, worker_id: str, lease: float) -> bool:
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND claimed_by = ?",
+                (time.time() + lease, job_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def _list(self, offset: int, limit: int) -> tuple[list[dict], int]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT job_id, {', '.join(SUMMARY_FIELDS)} FROM jobs "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+            total = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return [dict(row) for row in rows], total
+
+    def _prune(self, max_age: Optional[float], max_jobs: Optional[int]) -> list[str]:
+        finished = f"status IN ({', '.join('?' for _ in FINISHED_STATUSES)})"
+        conditions = []
+        params = list(FINISHED_STATUSES)
+        if max_age:
+            conditions.append("updated_at < ?")
+            params.append(time.time() - max_age)
+        if max_jobs:
+            conditions.append(
+                f"job_id NOT IN (SELECT job_id FROM jobs WHERE {finished} ORDER BY updated_at DESC LIMIT ?)"
+            )
+            params.extend([*FINISHED_STATUSES, max_jobs])
+        if not conditions:
+            return []
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            evicted = [
+                row["job_id"] for row in conn.execute(
+                    f"SELECT job_id FROM jobs WHERE {finished} AND ({' OR '.join(conditions)})",
+                    params
+                )
+            ]
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in evicted])
+            conn.execute("COMMIT")
+            return evicted
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    async def create(self, job_id: str, payload: dict) -> dict:
+        return await asyncio.to_thread(self._create, job_id, payload)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def update(self, job_id: str, **fields) -> None:
+        await asyncio.to_thread(self._update, job_id, fields)
+
+    async def claim(self, worker_id: str, lease: float = 60.0) -> Optional[dict]:
+        return await asyncio.to_thread(self._claim, worker_id, lease)
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease: float = 60.0) -> bool:
+        return await asyncio.to_thread(self._heartbeat, job_id, worker_id, lease)
+
+    async def list_jobs(self, offset: int = 0, limit: int = 20) -> tuple[list[dict], int]:
+        return await asyncio.to_thread(self._list, offset, limit)
+
+    async def prune(self, max_age: Optional[float] = None, max_jobs: Optional[int] = None) -> list[str]:
+        return await asyncio.to_thread(self._prune, max_age, max_jobs)
+
+
+class RedisJobStore(JobStore):
+    """
+    Redis store for processes on several nodes.
+
+    Each job is a hash at `{prefix}:job:{id}`; queued ids live in the list
+    `{prefix}:queue`. Claimed jobs sit in the `{prefix}:leases` sorted set
+    scored by lease expiry. Claims and heartbeats run as Lua scripts, so
+    taking a job off the queue (or over from an expired lease) and
+    recording the new holder happen in one atomic step.
+    Sorted sets index all jobs by creation time and finished jobs by
+    completion time for listing and eviction.
+    Works with any Redis-protocol server (Redis, Valkey, KeyDB, fakeredis).
+    """
+
+    name = "redis"
+
+    # KEYS: queue, leases; ARGV: key prefix, worker id, now, lease expiry
+    CLAIM_SCRIPT = """
+    local job_id = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[3], 'LIMIT', 0, 1)[1]
+    if not job_id then
+        job_id = redis.call('LPOP', KEYS[1])
+        if not job_id then
+            return nil
+        end
+    end
+    local key = ARGV[1] .. ':job:' .. job_id
+    redis.call('ZADD', KEYS[2], ARGV[4], job_id)
+    redis.call('HSET', key, 'claimed_by', ARGV[2])
+    return {job_id, redis.call('HGET', key, 'payload')}
+    """
+
+    # KEYS: job hash, leases; ARGV: job id, worker id, lease expiry
+    HEARTBEAT_SCRIPT = """
+    if redis.call('HGET', KEYS[1], 'claimed_by') ~= ARGV[2]
+        or not redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+    return 1
+    """
+
+    def __init__(self, client, prefix: str = "lifeos:video"):
+        self.client = client
+        self.prefix = prefix
+        self._queue = f"{prefix}:queue"
+        self._index = f"{prefix}:jobs"
+        self._finished = f"{prefix}:finished"
+        self._leases = f"{prefix}:leases"
+        self._claim = client.register_script(self.CLAIM_SCRIPT)
+        self._heartbeat = client.register_script(self.HEARTBEAT_SCRIPT)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    @staticmethod
+    def _encode(fields: dict) -> dict:
+        return {k: json.dumps(v) for k, v in fields.items() if k in JOB_FIELDS}
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def create(self, job_id: str, payload: dict) -> dict:
+        job = _new_job(job_id)
+        now = time.time()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(job_id), mapping={
+                **self._encode(job),
+                "payload": json.dumps(payload),
+                "created_at": now,
+                "updated_at": now
+            })
+            pipe.zadd(self._index, {job_id: now})
+            pipe.rpush(self._queue, job_id)
+            await pipe.execute()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        values = await self.client.hmget(self._key(job_id), *JOB_FIELDS)
+        if values[0] is None:
+            return None
+        return {"job_id": job_id, **{k: json.loads(v) for k, v in zip(JOB_FIELDS, values)}}
+
+    async def update(self, job_id: str, **fields) -> None:
+        encoded = self._encode(fields)
+        if not encoded or not await self.client.exists(self._key(job_id)):
+            return
+        now = time.time()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(job_id), mapping={**encoded, "updated_at": now})
+            if fields.get("status") in FINISHED_STATUSES:
+                pipe.zadd(self._finished, {job_id: now})
+                pipe.zrem(self._leases, job_id)
+            await pipe.execute()
+
+    async def claim(self, worker_id: str, lease: float = 60.0) -> Optional[dict]:
+        now = time.time()
+        claimed = await self._claim(
+            keys=[self._queue, self._leases],
+            args=[self.prefix, worker_id, now, now + lease]
+        )
+        if not claimed:
+            return None
+        job_id, payload = claimed
+        return {"job_id": self._decode(job_id), "payload": json.loads(payload) if payload else {}}
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease: float = 60.0) -> bool:
+        renewed = await self._heartbeat(
+            keys=[self._key(job_id), self._leases],
+            args=[job_id, worker_id, time.time() + lease]
+        )
+        return bool(renewed)
+
+    async def list_jobs(self, offset: int = 0, limit: int = 20) -> tuple[list[dict], int]:
+        job_ids = [self._decode(j) for j in await self.client.zrevrange(self._index, offset, offset + limit - 1)]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hmget(self._key(job_id), *SUMMARY_FIELDS)
+            pipe.zcard(self._index)
+            *rows, total = await pipe.execute()
+
+        page = []
+        for job_id, (status, progress, message, created_at, updated_at) in zip(job_ids, rows):
+            if status is None:
+                continue
+            page.append({
+                "job_id": job_id,
+                "status": json.loads(status),
+                "progress": json.loads(progress),
+                "message": json.loads(message),
+                "created_at": float(created_at),
+                "updated_at": float(updated_at)
+            })
+        return page, total
+
+    async def prune(self, max_age: Optional[float] = None, max_jobs: Optional[int] = None) -> list[str]:
+        evicted = set()
+        if max_age:
+            evicted.update(await self.client.zrangebyscore(self._finished, "-inf", time.time() - max_age))
+        if max_jobs:
+            evicted.update(await self.client.zrevrange(self._finished, max_jobs, -1))
+        evicted = [self._decode(j) for j in evicted]
+        if not evicted:
+            return []
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(*(self._key(job_id) for job_id in evicted))
+            pipe.zrem(self._finished, *evicted)
+            pipe.zrem(self._index, *evicted)
+            pipe.zrem(self._leases, *evicted)
+            await pipe.execute()
+        return evicted
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class ResultStore:
+    """
+    Keeps large job results on disk as JSON.
+
+    Results above `inline_max_bytes` are written to `{base_dir}/{job_id}/result.json`
+    and replaced in the job store by a small reference, which `load` resolves
+    when the result is actually requested. With several nodes, `base_dir`
+    must be a shared volume.
+    """
+
+    def __init__(self, base_dir: str, inline_max_bytes: int = 2048):
+        self.base_dir = base_dir
+        self.inline_max_bytes = inline_max_bytes
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.base_dir, job_id, "result.json")
+
+    async def offload(self, job_id: str, result: Optional[dict]) -> Optional[dict]:
+        """Return the value to keep in the job store for `result`."""
+        if result is None:
+            return None
+        data = json.dumps(result, ensure_ascii=False)
+        if len(data.encode("utf-8")) <= self.inline_max_bytes:
+            return result
+
+        path = self._path(job_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with aiofiles.open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            await f.write(data)
+        os.replace(f"{path}.tmp", path)
+        return {RESULT_REF_KEY: os.path.basename(path)}
+
+    async def load(self, job_id: str, stored: Optional[dict]) -> Optional[dict]:
+        """Resolve a stored result, reading it from disk if it was offloaded."""
+        if not stored or RESULT_REF_KEY not in stored:
+            return stored
+        try:
+            async with aiofiles.open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.loads(await f.read())
+        except FileNotFoundError:
+            return None
+
+    def delete(self, job_id: str) -> None:
+        """Remove everything kept on disk for a job."""
+        shutil.rmtree(os.path.join(self.base_dir, job_id), ignore_errors=True)
+
+
+def create_job_store(name: Optional[str] = None) -> JobStore:
+    """Create a job store configured from environment variables."""
+    name = name or os.getenv("JOB_STORE", "memory")
+
+    if name == "memory":
+        return MemoryJobStore()
+
+    if name == "sqlite":
+        temp_dir = os.getenv("TEMP_DIR", "/tmp/video-processing")
+        return SQLiteJobStore(os.getenv("JOB_STORE_PATH", os.path.join(temp_dir, "jobs.db")))
+
+    if name == "redis":
+        import redis.asyncio as redis
+
+        client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        return RedisJobStore(client, prefix=os.getenv("REDIS_PREFIX", "lifeos:video"))
+
+    raise ValueError(f"Unknown job store: {name}")
+
+
+async def _self_check(store: JobStore) -> dict:
+    """Exercise claims, lease takeover and pruning against a store."""
+    lease = 0.5
+    for job_id in ("a", "b", "c"):
+        await store.create(job_id, {"video_url": f"{job_id}.mp4"})
+
+    first = await store.claim("w1", lease=lease)
+    second = await store.claim("w2", lease=lease)
+    assert (first["job_id"], second["job_id"]) == ("a", "b"), "jobs are claimed in order"
+    assert first["payload"] == {"video_url": "a.mp4"}, "claim returns the payload"
+    assert await store.heartbeat("a", "w1", lease=lease), "holder renews its lease"
+    assert not await store.heartbeat("a", "w2", lease=lease), "other workers cannot renew"
+
+    await asyncio.sleep(lease / 2)
+    await store.heartbeat("b", "w2", lease=lease)
+    await asyncio.sleep(lease / 2 + 0.1)
+    takeover = await store.claim("w3", lease=lease)
+    assert takeover["job_id"] == "a", "expired lease is taken over before queued jobs"
+    assert not await store.heartbeat("a", "w1", lease=lease), "previous holder lost its lease"
+    assert (await store.claim("w3", lease=lease))["job_id"] == "c"
+    assert await store.claim("w3", lease=lease) is None, "queue is empty"
+
+    for job_id in ("a", "b", "c"):
+        await store.update(job_id, status="completed", progress=100)
+    assert await store.claim("w4", lease=0) is None, "finished jobs are never reclaimed"
+
+    evicted = await store.prune(max_jobs=1)
+    _, total = await store.list_jobs()
+    assert len(evicted) == 2 and total == 1, "prune keeps the newest finished job"
+
+    job_ids = [f"job-{i}" for i in range(50)]
+    for job_id in job_ids:
+        await store.create(job_id, {})
+    claims = await asyncio.gather(*(store.claim(f"w{i}", lease=60.0) for i in range(60)))
+    claimed = [c["job_id"] for c in claims if c]
+    assert sorted(claimed) == sorted(job_ids), "concurrent claims hand out each job once"
+
+    return {"store": store.name, "claimed": len(claimed), "evicted": evicted}
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("memory", "sqlite", "redis", "fakeredis"):
+        print("Usage: python job_store.py <memory|sqlite|redis|fakeredis>")
+        print("Runs a claim/lease/prune check; redis uses REDIS_URL and a temporary REDIS_PREFIX, deleted afterwards")
+        sys.exit(1)
+
+    backend = sys.argv[1]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if backend == "sqlite":
+            store = SQLiteJobStore(os.path.join(temp_dir, "jobs.db"))
+        elif backend == "fakeredis":
+            import fakeredis
+
+            store = RedisJobStore(fakeredis.FakeAsyncRedis(), prefix="check")
+        elif backend == "redis":
+            os.environ["REDIS_PREFIX"] = f"lifeos:check:{os.getpid()}"
+            store = create_job_store("redis")
+        else:
+            store = MemoryJobStore()
+
+        async def main():
+            try:
+                return await _self_check(store)
+            finally:
+                if isinstance(store, RedisJobStore):
+                    # Remove every key the check created under its prefix
+                    keys = [key async for key in store.client.scan_iter(match=f"{store.prefix}:*")]
+                    if keys:
+                        await store.client.delete(*keys)
+                await store.close()
+
+        result = asyncio.run(main())
+        print(f"Result: {result}")
@@ -0,0 +1,487 @@
+"""
+Load Test Harness
+Measures how much concurrent /process traffic one box can sustain
+
+Starts:
+- a stub server standing in for Supabase REST/Storage, the OpenAI audio
+  endpoints and the source video host, with injected latency and errors
+- the FastAPI app in a uvicorn subprocess pointed at the stub server
+
+then submits synthetic videos on a configurable arrival pattern and reports
+throughput, job latency and queue wait percentiles, /status latency, peak
+RSS (service process tree, including FFmpeg) and peak disk usage.
+
+Usage:
+    python loadtest.py --jobs 20 --pattern poisson --rate 0.2
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
+
+from transcription import stub_transcript
+
+
+SERVICE_DIR = Path(__file__).resolve().parent
+PATTERNS = ("constant", "poisson", "burst", "ramp")
+
+
+def generate_synthetic_video(
+    output_path: str,
+    duration: float,
+    speech_duration: float = 4.0,
+    silence_duration: float = 1.5
+) -> bool:
+    """Generate a test video whose tone alternates with silence, so silence removal has work to do."""
+    period = speech_duration + silence_duration
+    audio = (
+        f"sine=frequency=440:duration={duration},"
+        f"volume='if(lt(mod(t\\,{period})\\,{speech_duration})\\,1\\,0)':eval=frame"
+    )
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={duration}",
+        "-f", "lavfi", "-i", audio,
+        "-shortest",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-c:a", "aac",
+        output_path
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    return result.returncode == 0
+
+
+def create_stub_app(
+    videos_dir: str,
+    supabase_latency: float = 0.05,
+    supabase_error_rate: float = 0.0,
+    openai_latency: float = 1.0,
+    openai_jitter: float = 0.5,
+    openai_error_rate: float = 0.0,
+    openai_retry_after: float = 1.0,
+    language: str = "en",
+    seed: int = 0
+) -> FastAPI:
+    """
+    Build the stand-in server.
+
+    Supabase errors are 503s; OpenAI errors are 429s with Retry-After, like
+    a provider rate limit. Request and error counts end up in app.state.stats.
+    """
+    app = FastAPI(title="LifeOS Video Processor load test stubs")
+    rng = random.Random(seed)
+    stats: dict[str, dict] = {}
+    app.state.stats = stats
+
+    async def inject(endpoint: str, latency: float, jitter: float, error_rate: float) -> bool:
+        """Sleep for the injected latency. Returns True if this request should fail."""
+        counts = stats.setdefault(endpoint, {"requests": 0, "errors": 0})
+        counts["requests"] += 1
+        await asyncio.sleep(latency + rng.uniform(0, jitter))
+        if rng.random() < error_rate:
+            counts["errors"] += 1
+            return True
+        return False
+
+    @app.patch("/rest/v1/video_projects")
+    async def update_project(request: Request):
+        await request.body()
+        if await inject("supabase_rest", supabase_latency, 0, supabase_error_rate):
+            return Response(status_code=503)
+        return Response(status_code=204)
+
+    @app.post("/storage/v1/object/{bucket}/{path:path}")
+    async def upload_object(bucket: str, path: str, request: Request):
+        await request.body()
+        if await inject("supabase_storage", supabase_latency, 0, supabase_error_rate):
+            return Response(status_code=503)
+        return {"Key": f"{bucket}/{path}"}
+
+    @app.get("/videos/{name}")
+    async def download_video(name: str):
+        if await inject("video_download", supabase_latency, 0, supabase_error_rate):
+            return Response(status_code=503)
+        return FileResponse(os.path.join(videos_dir, name), media_type="video/mp4")
+
+    async def audio_endpoint(endpoint: str, request: Request, result_language: str, prefix: str):
+        body = await request.body()
+        if await inject(endpoint, openai_latency, openai_jitter, openai_error_rate):
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(openai_retry_after)},
+                content={"error": {
+                    "message": "Rate limit reached (injected by load test)",
+                    "type": "requests",
+                    "code": "rate_limit_exceeded"
+                }}
+            )
+        return stub_transcript(body, result_language, prefix)
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        return await audio_endpoint("openai_transcriptions", request, language, "")
+
+    @app.post("/v1/audio/translations")
+    async def translations(request: Request):
+        return await audio_endpoint("openai_translations", request, "en", "[en] ")
+
+    return app
+
+
+def arrival_times(pattern: str, jobs: int, rate: float, burst_size: int = 5, seed: int = 0) -> list[float]:
+    """
+    Submission offsets in seconds for `jobs` jobs arriving at `rate` jobs/s on average.
+
+    - constant: evenly spaced
+    - poisson: exponential gaps
+    - burst: `burst_size` jobs at once, bursts spaced to keep the average rate
+    - ramp: the rate grows linearly from rate/10 to rate
+    """
+    rng = random.Random(seed)
+    times = []
+    t = 0.0
+    for i in range(jobs):
+        if pattern == "constant":
+            t = i / rate
+        elif pattern == "poisson":
+            t += rng.expovariate(rate) if i else 0.0
+        elif pattern == "burst":
+            t = (i // burst_size) * burst_size / rate
+        elif pattern == "ramp":
+            if i:
+                t += 1 / (rate * (0.1 + 0.9 * i / max(1, jobs - 1)))
+        else:
+            raise ValueError(f"Unknown arrival pattern: {pattern}")
+        times.append(t)
+    return times
+
+
+def percentiles(values: list[float], scale: float = 1.0) -> dict:
+    """Nearest-rank p50/p95/p99 and max."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        return round(ordered[index] * scale, 3)
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99), "max": round(ordered[-1] * scale, 3)}
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident memory in bytes of a process and all its descendants (Linux /proc)."""
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ')'
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+        stack.extend(children.get(current, []))
+    return total
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files under `path`."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+async def monitor_resources(pid: int, temp_dir: str, peaks: dict, interval: float = 0.5):
+    """Track peak RSS and disk usage of the service until cancelled."""
+    while True:
+        peaks["rss"] = max(peaks.get("rss", 0), await asyncio.to_thread(process_tree_rss, pid))
+        peaks["disk"] = max(peaks.get("disk", 0), await asyncio.to_thread(directory_size, temp_dir))
+        await asyncio.sleep(interval)
+
+
+async def run_job(
+    client: httpx.AsyncClient,
+    index: int,
+    video_url: str,
+    submit_at: float,
+    options: dict,
+    poll_interval: float,
+    timeout: float,
+    status_latencies: list
+) -> dict:
+    """Submit one job at its arrival time and poll it to completion."""
+    await asyncio.sleep(max(0.0, submit_at - time.monotonic()))
+    submitted = time.monotonic()
+
+    try:
+        response = await client.post("/process", json={
+            "video_url": video_url,
+            "shape_id": f"shape:loadtest{index}",
+            "options": options
+        })
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        return {"status": "rejected", "error": str(e)}
+    job_id = response.json()["job_id"]
+
+    started = None
+    status = "pending"
+    while time.monotonic() - submitted < timeout:
+        request_start = time.monotonic()
+        try:
+            response = await client.get(f"/status/{job_id}")
+            status_latencies.append(time.monotonic() - request_start)
+            response.raise_for_status()
+            status = response.json()["status"]
+        except httpx.HTTPError:
+            status = "unknown"
+
+        if started is None and status not in ("pending", "unknown"):
+            started = time.monotonic()
+        if status in ("completed", "failed"):
+            break
+        await asyncio.sleep(poll_interval)
+    else:
+        status = "timed_out"
+
+    finished = time.monotonic()
+    return {
+        "job_id": job_id,
+        "status": status,
+        "latency": finished - submitted,
+        "queue_wait": (started or finished) - submitted,
+        "finished": finished
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_healthy(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Service exited with code {proc.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("Service did not become healthy")
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    """Run one load test and return the report."""
+    work_dir = tempfile.mkdtemp(prefix="lifeos-loadtest-")
+    videos_dir = os.path.join(work_dir, "videos")
+    temp_dir = os.path.join(work_dir, "service")
+    os.makedirs(videos_dir)
+    os.makedirs(temp_dir)
+
+    # Synthetic source videos, one per requested duration
+    durations = [float(d) for d in args.video_durations.split(",")]
+    video_names = []
+    for duration in durations:
+        name = f"synthetic_{duration:g}s.mp4"
+        if not generate_synthetic_video(os.path.join(videos_dir, name), duration):
+            raise RuntimeError("Failed to generate synthetic video (is FFmpeg installed?)")
+        video_names.append(name)
+
+    # Stand-in server, run in this process
+    stub_app = create_stub_app(
+        videos_dir,
+        supabase_latency=args.supabase_latency,
+        supabase_error_rate=args.supabase_error_rate,
+        openai_latency=args.openai_latency,
+        openai_jitter=args.openai_jitter,
+        openai_error_rate=args.openai_error_rate,
+        openai_retry_after=args.openai_retry_after,
+        language=args.language,
+        seed=args.seed
+    )
+    stub_port = _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stub_server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=stub_port, log_level="warning"))
+    stub_task = asyncio.create_task(stub_server.serve())
+    while not stub_server.started:
+        await asyncio.sleep(0.05)
+
+    # The service under test
+    job_store = args.job_store or ("sqlite" if args.service_workers > 1 else "memory")
+    service_port = _free_port()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": stub_url,
+        "SUPABASE_SERVICE_ROLE_KEY": "loadtest",
+        "OPENAI_API_KEY": "loadtest",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "TRANSCRIPTION_BACKEND": "openai",
+        "TEMP_DIR": temp_dir,
+        "JOB_STORE": job_store,
+        "WORKER_CONCURRENCY": str(args.worker_concurrency),
+        "TRANSCRIPTION_PROCESSES": str(args.service_workers)
+    }
+    if job_store == "redis":
+        # REDIS_URL is passed through; a fresh prefix keeps runs apart
+        env["REDIS_PREFIX"] = f"lifeos:loadtest:{uuid.uuid4().hex}"
+    log_path = os.path.join(work_dir, "service.log")
+    with open(log_path, "w") as log_file:
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--host", "127.0.0.1",
+                "--port", str(service_port),
+                "--workers", str(args.service_workers),
+                "--log-level", "warning"
+            ],
+            cwd=SERVICE_DIR,
+            env=env,
+            stdout=log_file,
+            stderr=subprocess.STDOUT
+        )
+
+    peaks: dict = {}
+    monitor = None
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{service_port}", timeout=30.0) as client:
+            await _wait_healthy(client, proc)
+            monitor = asyncio.create_task(monitor_resources(proc.pid, temp_dir, peaks))
+
+            offsets = arrival_times(args.pattern, args.jobs, args.rate, args.burst_size, args.seed)
+            options = json.loads(args.options)
+            status_latencies: list[float] = []
+            started = time.monotonic()
+            results = await asyncio.gather(*(
+                run_job(
+                    client,
+                    i,
+                    f"{stub_url}/videos/{video_names[i % len(video_names)]}",
+                    started + offset,
+                    options,
+                    args.poll_interval,
+                    args.timeout,
+                    status_latencies
+                )
+                for i, offset in enumerate(offsets)
+            ))
+    finally:
+        if monitor is not None:
+            monitor.cancel()
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        stub_server.should_exit = True
+        await stub_task
+
+    completed = [r for r in results if r["status"] == "completed"]
+    finished = [r for r in results if "finished" in r]
+    elapsed = (max(r["finished"] for r in finished) - started) if finished else 0.0
+    counts: dict[str, int] = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+
+    report = {
+        "pattern": args.pattern,
+        "jobs": args.jobs,
+        "rate": args.rate,
+        "service_workers": args.service_workers,
+        "worker_concurrency": args.worker_concurrency,
+        "job_store": job_store,
+        "outcomes": counts,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_jobs_per_min": round(len(completed) / elapsed * 60, 2) if elapsed else 0.0,
+        "job_latency_s": percentiles([r["latency"] for r in completed]),
+        "queue_wait_s": percentiles([r["queue_wait"] for r in finished]),
+        "status_latency_ms": percentiles(status_latencies, scale=1000),
+        "peak_rss_mb": round(peaks.get("rss", 0) / 1024 / 1024, 1),
+        "peak_disk_mb": round(peaks.get("disk", 0) / 1024 / 1024, 1),
+        "stub_requests": stub_app.state.stats
+    }
+
+    if args.keep_temp:
+        report["work_dir"] = work_dir
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the LifeOS video processor against local stubs")
+    parser.add_argument("--jobs", type=int, default=20, help="Number of jobs to submit")
+    parser.add_argument("--pattern", choices=PATTERNS, default="poisson", help="Arrival pattern")
+    parser.add_argument("--rate", type=float, default=0.2, help="Average arrival rate in jobs per second")
+    parser.add_argument("--burst-size", type=int, default=5, help="Jobs per burst for --pattern burst")
+    parser.add_argument("--video-durations", default="20", help="Comma-separated synthetic video durations (s)")
+    parser.add_argument("--options", default="{}", help="Processing options JSON sent with each job")
+    parser.add_argument("--service-workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--worker-concurrency", type=int, default=2, help="WORKER_CONCURRENCY per process")
+    parser.add_argument("--job-store", choices=("memory", "sqlite", "redis"), help="Defaults to sqlite with several workers; redis uses REDIS_URL")
+    parser.add_argument("--supabase-latency", type=float, default=0.05, help="Injected Supabase latency (s)")
+    parser.add_argument("--supabase-error-rate", type=float, default=0.0, help="Fraction of Supabase requests failing with 503")
+    parser.add_argument("--openai-latency", type=float, default=1.0, help="Injected OpenAI latency (s)")
+    parser.add_argument("--openai-jitter", type=float, default=0.5, help="Extra random OpenAI latency, up to this (s)")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0, help="Fraction of OpenAI requests failing with 429")
+    parser.add_argument("--openai-retry-after", type=float, default=1.0, help="Retry-After sent with injected 429s (s)")
+    parser.add_argument("--language", default="en", help="Language reported by the transcription stub (mn also exercises translation)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between /status polls per job")
+    parser.add_argument("--timeout", type=float, default=900.0, help="Give up on a job after this many seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for arrivals and injected faults")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    parser.add_argument("--keep-temp", action="store_true", help="Keep videos, job files and service.log")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = asyncio.run(run_load_test(arguments))
+
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    print(f"Result: {json.dumps(result, indent=2)}")
@@ -5,20 +5,27 @@ Handles video processing requests from LifeOS
 Endpoints:
 - POST /process: Start video processing
 - GET /status/{job_id}: Check processing status
+- GET /jobs: List jobs (paginated, without results)
 - GET /health: Health check
 
+Jobs are queued in a shared store (see job_store.py) and claimed by worker
+loops in every server process, so the service can run with several uvicorn
+workers or replicas.
+
 Deploy this to Railway, Render, or any Python hosting service.
 """
 
 import os
 import uuid
+import socket
 import asyncio
+import threading
 from typing import Optional
 from datetime import datetime
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
@@ -26,11 +33,22 @@ import aiofiles
 
 from silence_remover import remove_silence
 from caption_generator import generate_bilingual_captions
+from transcription import close_backend
+from job_store import ResultStore, create_job_store
+from checkpoint import Checkpoint
+from preview_generator import generate_sprite_vtt
 
 # Environment variables
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 TEMP_DIR = os.getenv("TEMP_DIR", "/tmp/video-processing")
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+JOB_RETENTION_MAX_JOBS = int(os.getenv("JOB_RETENTION_MAX_JOBS", "1000"))
+JOB_RETENTION_INTERVAL = float(os.getenv("JOB_RETENTION_INTERVAL", "300"))
+RESULT_INLINE_MAX_BYTES = int(os.getenv("RESULT_INLINE_MAX_BYTES", "2048"))
 
 
 # Models
@@ -54,17 +72,137 @@ class JobStatus(BaseModel):
     result: Optional[dict] = None
 
 
-# In-memory job storage (use Redis in production)
-jobs: dict[str, JobStatus] = {}
+class JobSummary(BaseModel):
+    job_id: str
+    status: str
+    progress: int
+    message: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class JobList(BaseModel):
+    jobs: list[JobSummary]
+    total: int
+    offset: int
+    limit: int
+
+
+# Checkpointed pipeline stages, in order
+PIPELINE_STAGES = ["downloading", "removing_silence", "generating_captions", "uploading"]
+
+
+# Shared job storage (JOB_STORE=memory|sqlite|redis)
+store = create_job_store()
+
+# Large results live on disk next to the job files
+results = ResultStore(TEMP_DIR, inline_max_bytes=RESULT_INLINE_MAX_BYTES)
+
+# Wakes local workers as soon as a job is queued by this process
+job_available = asyncio.Event()
+
+
+async def set_job_status(job_id: str, status: str, progress: int, message: str, result: Optional[dict] = None):
+    """Update job status in the shared store."""
+    result = await results.offload(job_id, result)
+    await store.update(job_id, status=status, progress=progress, message=message, result=result)
+
+
+async def retention_loop():
+    """Periodically evict finished jobs and their on-disk files."""
+    while True:
+        try:
+            evicted = await store.prune(
+                max_age=JOB_RETENTION_SECONDS or None,
+                max_jobs=JOB_RETENTION_MAX_JOBS or None
+            )
+            for job_id in evicted:
+                results.delete(job_id)
+            if evicted:
+                print(f"Evicted {len(evicted)} finished jobs")
+        except Exception as e:
+            print(f"Job retention failed: {e}")
+        await asyncio.sleep(JOB_RETENTION_INTERVAL)
+
+
+async def keep_lease(job_id: str, worker_id: str, processing: asyncio.Task):
+    """
+    Renew the worker's lease on a job until cancelled.
+
+    If another worker has taken the job over, `processing` is cancelled so
+    the job is not run twice.
+    """
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            if not await store.heartbeat(job_id, worker_id, lease=JOB_LEASE_SECONDS):
+                print(f"Worker {worker_id} lost its lease on job {job_id}, stopping")
+                processing.cancel()
+                return
+        except Exception as e:
+            print(f"Worker {worker_id} failed to renew lease on job {job_id}: {e}")
+
+
+async def worker_loop(worker_id: str):
+    """
+    Claim jobs from the shared store and process them one at a time.
+
+    Jobs whose worker died are reclaimed once their lease expires and resume
+    from their last checkpoint.
+    """
+    while True:
+        try:
+            job = await store.claim(worker_id, lease=JOB_LEASE_SECONDS)
+        except Exception as e:
+            print(f"Worker {worker_id} failed to claim job: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(job_available.wait(), timeout=WORKER_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            job_available.clear()
+            continue
+
+        payload = job["payload"]
+        processing = asyncio.create_task(process_video_task(
+            job["job_id"],
+            payload["video_url"],
+            payload["shape_id"],
+            payload.get("options", {})
+        ))
+        lease = asyncio.create_task(keep_lease(job["job_id"], worker_id, processing))
+        try:
+            await processing
+        except asyncio.CancelledError:
+            # Cancelled by keep_lease: the job now belongs to another worker
+            if not lease.done():
+                raise
+        except Exception as e:
+            # Keep the worker alive; the job's lease expires and it is retried
+            print(f"Worker {worker_id} failed to process job {job['job_id']}: {e}")
+        finally:
+            lease.cancel()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     os.makedirs(TEMP_DIR, exist_ok=True)
+    worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+    tasks = [
+        asyncio.create_task(worker_loop(f"{worker_prefix}:{i}"))
+        for i in range(WORKER_CONCURRENCY)
+    ]
+    tasks.append(asyncio.create_task(retention_loop()))
     yield
     # Shutdown
-    pass
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_backend()
+    await store.close()
 
 
 app = FastAPI(
@@ -125,12 +263,17 @@ async def download_video(url: str, output_path: str) -> bool:
             return False
 
 
-async def upload_to_supabase(file_path: str, bucket: str = "videos") -> Optional[str]:
+async def upload_to_supabase(
+    file_path: str,
+    bucket: str = "videos",
+    content_type: str = "video/mp4",
+    name: Optional[str] = None
+) -> Optional[str]:
     """Upload file to Supabase Storage."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         return None
 
-    filename = f"processed/{datetime.now().strftime('%Y%m%d_%H%M%S')}_{Path(file_path).name}"
+    filename = f"processed/{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name or Path(file_path).name}"
 
     async with httpx.AsyncClient(timeout=300.0) as client:
         try:
@@ -143,7 +286,7 @@ async def upload_to_supabase(file_path: str, bucket: str = "videos") -> Optional
                 headers={
                     "apikey": SUPABASE_KEY,
                     "Authorization": f"Bearer {SUPABASE_KEY}",
-                    "Content-Type": "video/mp4"
+                    "Content-Type": content_type
                 }
             )
             response.raise_for_status()
@@ -155,69 +298,134 @@ async def upload_to_supabase(file_path: str, bucket: str = "videos") -> Optional
             return None
 
 
+async def upload_previews(job_id: str, preview: dict) -> dict:
+    """Upload waveform peaks, the thumbnail sprite and its VTT index next to the video."""
+    waveform_url = await upload_to_supabase(
+        preview["waveform_path"], content_type="application/json", name=f"{job_id}_waveform.json"
+    )
+    sprite_url = await upload_to_supabase(
+        preview["sprite_path"], content_type="image/jpeg", name=f"{job_id}_sprite.jpg"
+    )
+
+    # The VTT cues reference the sprite by its final URL
+    vtt_path = os.path.join(os.path.dirname(preview["sprite_path"]), "sprite.vtt")
+    generate_sprite_vtt(preview["thumbnails"], sprite_url or Path(preview["sprite_path"]).name, vtt_path)
+    thumbnails_url = await upload_to_supabase(
+        vtt_path, content_type="text/vtt", name=f"{job_id}_thumbnails.vtt"
+    )
+
+    return {
+        "waveform_url": waveform_url,
+        "sprite_url": sprite_url,
+        "thumbnails_url": thumbnails_url
+    }
+
+
 async def process_video_task(job_id: str, video_url: str, shape_id: str, options: dict):
-    """Background task to process video."""
+    """
+    Background task to process video.
+
+    Each completed stage is checkpointed in the job directory, so a job that
+    was interrupted (crash, redeploy) skips the stages it already finished.
+    """
     job_dir = os.path.join(TEMP_DIR, job_id)
     os.makedirs(job_dir, exist_ok=True)
 
+    input_path = os.path.join(job_dir, "input.mp4")
+    silence_output = os.path.join(job_dir, "no_silence.mp4")
+    captions_dir = os.path.join(job_dir, "captions")
+    preview_dir = os.path.join(job_dir, "preview") if options.get("previews") else None
+
     try:
-        # Update status: downloading
-        jobs[job_id] = JobStatus(
-            job_id=job_id,
-            status="downloading",
-            progress=10,
-            message="Downloading video..."
-        )
+        checkpoint = Checkpoint(job_dir, PIPELINE_STAGES)
+        done = await checkpoint.restore()
+        if done:
+            print(f"Resuming job {job_id} after stage '{list(done)[-1]}'")
+
         await update_supabase_status(shape_id, "processing")
 
-        # Download video
-        input_path = os.path.join(job_dir, "input.mp4")
-        if not await download_video(video_url, input_path):
-            raise Exception("Failed to download video")
-
-        # Update status: removing silence
-        jobs[job_id].status = "removing_silence"
-        jobs[job_id].progress = 30
-        jobs[job_id].message = "Removing silence..."
-
-        # Remove silence
-        silence_output = os.path.join(job_dir, "no_silence.mp4")
-        silence_result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: remove_silence(
-                input_path,
+        if "downloading" not in done:
+            # Update status: downloading
+            await set_job_status(job_id, "downloading", 10, "Downloading video...")
+
+            # Download video
+            if not await download_video(video_url, input_path):
+                raise Exception("Failed to download video")
+
+            await checkpoint.record("downloading", [input_path])
+
+        if "removing_silence" in done:
+            silence_result = done["removing_silence"]
+        else:
+            # Update status: removing silence
+            await set_job_status(job_id, "removing_silence", 30, "Removing silence...")
+
+            # Remove silence
+            stop = threading.Event()
+            try:
+                silence_result = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: remove_silence(
+                        input_path,
+                        silence_output,
+                        noise_threshold=options.get("noise_threshold", "-30dB"),
+                        min_silence_duration=options.get("min_silence_duration", 0.5),
+                        preview_dir=preview_dir,
+                        thumbnail_interval=options.get("thumbnail_interval", 2.0),
+                        stop=stop
+                    )
+                )
+            except asyncio.CancelledError:
+                # The executor thread outlives the cancelled task: stop its FFmpeg processes
+                stop.set()
+                raise
+
+            if not silence_result.get("success"):
+                raise Exception(f"Silence removal failed: {silence_result.get('error')}")
+
+            artifacts = [silence_output]
+            if silence_result.get("preview", {}).get("success"):
+                artifacts += [silence_result["preview"]["waveform_path"], silence_result["preview"]["sprite_path"]]
+            await checkpoint.record("removing_silence", artifacts, silence_result)
+
+        # Preview files are uploaded below; keep their local paths out of the results
+        preview = silence_result.pop("preview", None)
+
+        if "generating_captions" in done:
+            caption_result = done["generating_captions"]
+        else:
+            # Update status: generating captions
+            await set_job_status(job_id, "generating_captions", 60, "Generating captions...")
+
+            # Generate captions
+            caption_result = await generate_bilingual_captions(
                 silence_output,
-                noise_threshold=options.get("noise_threshold", "-30dB"),
-                min_silence_duration=options.get("min_silence_duration", 0.5)
+                captions_dir,
+                model_size=options.get("whisper_model", "base")
             )
-        )
 
-        if not silence_result.get("success"):
-            raise Exception(f"Silence removal failed: {silence_result.get('error')}")
+            # Failed captions (or a failed translation) don't fail the job, but are retried on resume
+            translation = caption_result.get("english_translation")
+            if caption_result.get("success") and (translation is None or translation.get("success")):
+                caption_files = [os.path.join(captions_dir, name) for name in sorted(os.listdir(captions_dir))]
+                await checkpoint.record("generating_captions", caption_files, caption_result)
 
-        # Update status: generating captions
-        jobs[job_id].status = "generating_captions"
-        jobs[job_id].progress = 60
-        jobs[job_id].message = "Generating captions..."
+        if "uploading" in done:
+            output_url = done["uploading"]["output_url"]
+            previews = done["uploading"].get("previews")
+        else:
+            # Update status: uploading
+            await set_job_status(job_id, "uploading", 85, "Uploading processed video...")
 
-        # Generate captions
-        captions_dir = os.path.join(job_dir, "captions")
-        caption_result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: generate_bilingual_captions(
-                silence_output,
-                captions_dir,
-                model_size=options.get("whisper_model", "base")
-            )
-        )
+            # Upload processed video
+            output_url = await upload_to_supabase(silence_output)
 
-        # Update status: uploading
-        jobs[job_id].status = "uploading"
-        jobs[job_id].progress = 85
-        jobs[job_id].message = "Uploading processed video..."
+            # Upload waveform and thumbnails, if generated
+            previews = None
+            if preview is not None:
+                previews = await upload_previews(job_id, preview) if preview.get("success") else preview
 
-        # Upload processed video
-        output_url = await upload_to_supabase(silence_output)
+            await checkpoint.record("uploading", data={"output_url": output_url, "previews": previews})
 
         # Update Supabase with results
         await update_supabase_status(shape_id, "completed", {
@@ -228,31 +436,25 @@ async def process_video_task(job_id: str, video_url: str, shape_id: str, options
                     "success": caption_result.get("success"),
                     "language": caption_result.get("original", {}).get("language"),
                     "segment_count": caption_result.get("original", {}).get("segment_count")
-                }
+                },
+                "previews": previews
             }
         })
 
         # Update job status: completed
-        jobs[job_id] = JobStatus(
-            job_id=job_id,
-            status="completed",
-            progress=100,
-            message="Processing complete!",
-            result={
-                "output_url": output_url,
-                "silence_removal": silence_result,
-                "captions": caption_result
-            }
-        )
+        await set_job_status(job_id, "completed", 100, "Processing complete!", result={
+            "output_url": output_url,
+            "silence_removal": silence_result,
+            "captions": caption_result,
+            "previews": previews
+        })
 
     except Exception as e:
         error_message = str(e)
-        jobs[job_id] = JobStatus(
-            job_id=job_id,
-            status="failed",
-            progress=0,
-            message=f"Processing failed: {error_message}"
-        )
+        try:
+            await set_job_status(job_id, "failed", 0, f"Processing failed: {error_message}")
+        except Exception as status_error:
+            print(f"Failed to mark job {job_id} as failed: {status_error}")
         await update_supabase_status(shape_id, "failed", {
             "metadata": {"error": error_message}
         })
@@ -271,26 +473,17 @@ async def health_check():
 
 
 @app.post("/process", response_model=ProcessResponse)
-async def start_processing(request: ProcessRequest, background_tasks: BackgroundTasks):
+async def start_processing(request: ProcessRequest):
     """Start video processing job."""
     job_id = str(uuid.uuid4())
 
-    # Initialize job status
-    jobs[job_id] = JobStatus(
-        job_id=job_id,
-        status="pending",
-        progress=0,
-        message="Job queued"
-    )
-
-    # Start background processing
-    background_tasks.add_task(
-        process_video_task,
-        job_id,
-        request.video_url,
-        request.shape_id,
-        request.options
-    )
+    # Queue the job; any worker process sharing the store may claim it
+    await store.create(job_id, {
+        "video_url": request.video_url,
+        "shape_id": request.shape_id,
+        "options": request.options
+    })
+    job_available.set()
 
     return ProcessResponse(
         job_id=job_id,
@@ -302,10 +495,24 @@ async def start_processing(request: ProcessRequest, background_tasks: Background
 @app.get("/status/{job_id}", response_model=JobStatus)
 async def get_status(job_id: str):
     """Get job status."""
-    if job_id not in jobs:
+    job = await store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return jobs[job_id]
+    job["result"] = await results.load(job_id, job["result"])
+    return JobStatus(**job)
+
+
+@app.get("/jobs", response_model=JobList)
+async def list_jobs(offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
+    """List jobs, newest first. Results are not included; fetch them via /status."""
+    page, total = await store.list_jobs(offset=offset, limit=limit)
+    return JobList(
+        jobs=[JobSummary(**job) for job in page],
+        total=total,
+        offset=offset,
+        limit=limit
+    )
 
 
 if __name__ == "__main__":
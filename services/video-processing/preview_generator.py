@@ -0,0 +1,278 @@
+"""
+Preview Generator
+Builds waveform peaks and a thumbnail sprite sheet for the canvas VideoNode
+
+Nothing here decodes the video again. The silence remover hands over:
+- mono PCM written by the silence detection decode (see pcm_output_args)
+- thumbnails written by the segment render decode (see thumbnail_output_args)
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import shutil
+import tempfile
+import subprocess
+from array import array
+from typing import List, Optional, Tuple
+
+from caption_generator import format_timestamp
+
+
+PCM_SAMPLE_RATE = 8000
+PEAK_LEVELS = (256, 1024, 4096)  # Samples per peak, finest first
+THUMB_WIDTH = 160
+THUMB_HEIGHT = 90
+SPRITE_COLUMNS = 10
+MAX_THUMBNAILS = 300
+
+
+def pcm_output_args(pcm_path: str) -> list:
+    """FFmpeg output arguments writing the decoded audio as mono 16-bit PCM."""
+    return [
+        "-map", "0:a:0?",
+        "-ac", "1",
+        "-ar", str(PCM_SAMPLE_RATE),
+        "-f", "s16le",
+        pcm_path
+    ]
+
+
+def thumbnail_output_args(
+    pattern: str,
+    start: float,
+    end: float,
+    offset: float,
+    interval: float,
+    include_first: bool
+) -> list:
+    """
+    FFmpeg output arguments writing thumbnails for the input range [start, end).
+
+    Meant to be added as a second output to the command that renders that
+    range, so both share one decode. `offset` is where the range starts in
+    the output video; a frame is kept when it crosses a multiple of
+    `interval` on the output timeline, so thumbnails stay evenly spaced
+    across segment boundaries. showinfo logs the range-relative time of
+    every kept frame (see parse_thumbnail_times).
+    """
+    grid = f"gt(floor((t+{offset})/{interval}),floor((prev_t+{offset})/{interval}))"
+    expr = f"isnan(prev_t)+{grid}" if include_first else grid
+    video_filter = (
+        f"trim=start={start}:end={end},setpts=PTS-STARTPTS,"
+        f"select='{expr}',showinfo,"
+        f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={THUMB_WIDTH}:{THUMB_HEIGHT}:(ow-iw)/2:(oh-ih)/2"
+    )
+    return [
+        "-map", "0:v:0?",
+        "-an",
+        "-vf", video_filter,
+        "-fps_mode", "vfr",
+        "-q:v", "5",
+        pattern
+    ]
+
+
+def parse_thumbnail_times(stderr: str) -> List[float]:
+    """Extract the segment-relative time of each thumbnail from FFmpeg's showinfo output."""
+    return [
+        float(match)
+        for match in re.findall(r"Parsed_showinfo.*?pts_time:\s*(-?[\d.]+)", stderr)
+    ]
+
+
+def thumbnail_interval(requested: float, duration: float) -> float:
+    """Widen the interval if the video would need more than MAX_THUMBNAILS thumbnails."""
+    return max(requested, duration / MAX_THUMBNAILS)
+
+
+def compute_peaks(pcm_path: Optional[str], segments: Optional[List[Tuple[float, float]]] = None) -> dict:
+    """
+    Compute multi-resolution min/max peaks from mono 16-bit PCM.
+
+    Args:
+        pcm_path: Raw PCM written with pcm_output_args, or None for a video
+                  without audio (empty waveform)
+        segments: Kept (start, end) ranges of the input; peaks follow the
+                  output timeline. If None, the whole input is used.
+
+    Returns:
+        Waveform dict with one entry per resolution in `levels`; each `data`
+        is interleaved min/max pairs scaled to 8 bits.
+    """
+    samples = array("h")
+    if pcm_path:
+        with open(pcm_path, "rb") as f:
+            samples.frombytes(f.read())
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    if segments is not None:
+        kept = array("h")
+        for start, end in segments:
+            kept.extend(samples[int(start * PCM_SAMPLE_RATE):int(end * PCM_SAMPLE_RATE)])
+        samples = kept
+
+    finest = PEAK_LEVELS[0]
+    mins = []
+    maxs = []
+    for i in range(0, len(samples), finest):
+        chunk = samples[i:i + finest]
+        mins.append(min(chunk) >> 8)
+        maxs.append(max(chunk) >> 8)
+
+    levels = []
+    samples_per_peak = finest
+    for target in PEAK_LEVELS:
+        # Coarser levels merge groups of peaks from the previous level
+        factor = target // samples_per_peak
+        if factor > 1:
+            mins = [min(mins[i:i + factor]) for i in range(0, len(mins), factor)]
+            maxs = [max(maxs[i:i + factor]) for i in range(0, len(maxs), factor)]
+        samples_per_peak = target
+
+        data = []
+        for low, high in zip(mins, maxs):
+            data.extend((low, high))
+        levels.append({
+            "samples_per_pixel": target,
+            "length": len(mins),
+            "data": data
+        })
+
+    return {
+        "version": 2,
+        "channels": 1,
+        "sample_rate": PCM_SAMPLE_RATE,
+        "bits": 8,
+        "duration": round(len(samples) / PCM_SAMPLE_RATE, 3),
+        "levels": levels
+    }
+
+
+def build_sprite(
+    thumbnails: List[Tuple[float, str]],
+    output_path: str,
+    duration: float,
+    interval: float
+) -> List[dict]:
+    """
+    Tile thumbnails into a single JPEG sprite sheet.
+
+    Args:
+        thumbnails: (output time, path) of each thumbnail
+        output_path: Path of the sprite sheet
+        duration: Duration of the output video
+        interval: Thumbnail interval; closer thumbnails are dropped
+
+    Returns:
+        One cue per tile with start/end times and its x/y/w/h in the sprite
+    """
+    kept = []
+    for time, path in sorted(thumbnails):
+        if kept and time - kept[-1][0] < interval / 2:
+            continue
+        kept.append((time, path))
+    if not kept:
+        return []
+
+    columns = min(SPRITE_COLUMNS, len(kept))
+    rows = math.ceil(len(kept) / columns)
+
+    with tempfile.TemporaryDirectory() as frames_dir:
+        # Number the frames consecutively for FFmpeg's image sequence input
+        for i, (_, path) in enumerate(kept):
+            shutil.copyfile(path, os.path.join(frames_dir, f"{i:05d}.jpg"))
+
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-framerate", "1",
+            "-i", os.path.join(frames_dir, "%05d.jpg"),
+            "-vf", f"tile={columns}x{rows}",
+            "-frames:v", "1",
+            "-q:v", "5",
+            output_path
+        ]
+        subprocess.run(cmd, capture_output=True)
+
+    cues = []
+    for i, (time, _) in enumerate(kept):
+        end = kept[i + 1][0] if i + 1 < len(kept) else duration
+        cues.append({
+            "start": round(time, 3),
+            "end": round(max(end, time), 3),
+            "x": (i % columns) * THUMB_WIDTH,
+            "y": (i // columns) * THUMB_HEIGHT,
+            "w": THUMB_WIDTH,
+            "h": THUMB_HEIGHT
+        })
+    return cues
+
+
+def generate_previews(
+    pcm_path: Optional[str],
+    thumbnails: List[Tuple[float, str]],
+    output_dir: str,
+    duration: float,
+    interval: float,
+    segments: Optional[List[Tuple[float, float]]] = None
+) -> dict:
+    """
+    Generate waveform peaks and a thumbnail sprite sheet.
+
+    Args:
+        pcm_path: Mono PCM from the silence detection decode, or None without audio
+        thumbnails: (output time, path) of thumbnails from the render decode
+        output_dir: Directory to save waveform.json and sprite.jpg
+        duration: Duration of the output video
+        interval: Thumbnail interval in seconds
+        segments: Kept (start, end) ranges of the input, or None if nothing was cut
+
+    Returns:
+        Dictionary with paths to the generated files and the sprite cues
+    """
+    try:
+        waveform_path = os.path.join(output_dir, "waveform.json")
+        with open(waveform_path, "w", encoding="utf-8") as f:
+            json.dump(compute_peaks(pcm_path, segments), f, separators=(",", ":"))
+
+        sprite_path = os.path.join(output_dir, "sprite.jpg")
+        cues = build_sprite(thumbnails, sprite_path, duration, interval)
+        if not cues or not os.path.exists(sprite_path):
+            return {
+                "success": False,
+                "error": "Failed to generate thumbnail sprite"
+            }
+
+        return {
+            "success": True,
+            "waveform_path": waveform_path,
+            "sprite_path": sprite_path,
+            "thumbnails": cues
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Preview generation failed: {e}"
+        }
+    finally:
+        # The raw PCM is only needed to compute peaks
+        if pcm_path and os.path.exists(pcm_path):
+            os.remove(pcm_path)
+
+
+def generate_sprite_vtt(cues: List[dict], sprite_url: str, output_path: str) -> None:
+    """Generate a WebVTT thumbnail index pointing into the sprite sheet."""
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+
+        for cue in cues:
+            start = format_timestamp(cue["start"]).replace(",", ".")
+            end = format_timestamp(cue["end"]).replace(",", ".")
+
+            f.write(f"{start} --> {end}\n")
+            f.write(f"{sprite_url}#xywh={cue['x']},{cue['y']},{cue['w']},{cue['h']}\n\n")
@@ -5,15 +5,43 @@ Removes silent portions from video files
 
 import subprocess
 import tempfile
+import threading
 import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import preview_generator
+
+
+class SilenceRemovalCancelled(Exception):
+    """Raised when silence removal is stopped through its `stop` event."""
+
+
+def run_ffmpeg(cmd: list, stop: Optional[threading.Event] = None) -> subprocess.CompletedProcess:
+    """Run a command like subprocess.run, killing it early if `stop` is set."""
+    if stop is None:
+        return subprocess.run(cmd, capture_output=True, text=True)
+
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as proc:
+        while True:
+            if stop.is_set():
+                proc.kill()
+                proc.communicate()
+                raise SilenceRemovalCancelled("Silence removal was cancelled")
+            try:
+                stdout, stderr = proc.communicate(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
 
 
 def detect_silence(
     input_path: str,
     noise_threshold: str = "-30dB",
-    min_silence_duration: float = 0.5
+    min_silence_duration: float = 0.5,
+    pcm_output: Optional[str] = None,
+    stop: Optional[threading.Event] = None
 ) -> List[Tuple[float, float]]:
     """
     Detect silent portions in a video file.
@@ -22,23 +50,31 @@ def detect_silence(
         input_path: Path to input video file
         noise_threshold: Audio level below which is considered silence (default: -30dB)
         min_silence_duration: Minimum duration of silence to detect in seconds
+        pcm_output: If set, also write the decoded audio here as mono PCM
+                    (for waveform peaks) from the same decode
+        stop: If set while FFmpeg runs, kill it and raise SilenceRemovalCancelled
 
     Returns:
         List of tuples containing (start_time, end_time) of silent portions
+
+    Raises:
+        RuntimeError: If FFmpeg fails, so a failed decode isn't mistaken for "no silence"
     """
     cmd = [
         "ffmpeg",
+        "-y",
         "-i", input_path,
+        "-vn",
         "-af", f"silencedetect=noise={noise_threshold}:d={min_silence_duration}",
         "-f", "null",
         "-"
     ]
+    if pcm_output:
+        cmd.extend(preview_generator.pcm_output_args(pcm_output))
 
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True
-    )
+    result = run_ffmpeg(cmd, stop)
+    if result.returncode != 0:
+        raise RuntimeError(f"Silence detection failed: {result.stderr.strip()[-500:]}")
 
     # Parse silence detection output from stderr
     silence_periods = []
@@ -74,12 +110,55 @@ def get_video_duration(input_path: str) -> float:
     return float(result.stdout.strip())
 
 
+def has_audio(input_path: str) -> bool:
+    """Check whether a video file has an audio stream."""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "a",
+        "-show_entries", "stream=index",
+        "-of", "csv=p=0",
+        input_path
+    ]
+
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return bool(result.stdout.strip())
+
+
+def extract_thumbnails(
+    input_path: str,
+    thumbs_dir: str,
+    duration: float,
+    interval: float,
+    stop: Optional[threading.Event] = None
+) -> List[Tuple[float, str]]:
+    """Extract thumbnails from an uncut video. Returns (time, path) pairs."""
+    os.makedirs(thumbs_dir, exist_ok=True)
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i", input_path,
+        *preview_generator.thumbnail_output_args(
+            os.path.join(thumbs_dir, "thumb_%05d.jpg"), 0, duration, 0, interval, include_first=True
+        )
+    ]
+    result = run_ffmpeg(cmd, stop)
+    times = preview_generator.parse_thumbnail_times(result.stderr)
+    return [
+        (time, os.path.join(thumbs_dir, f"thumb_{i:05d}.jpg"))
+        for i, time in enumerate(times, 1)
+    ]
+
+
 def remove_silence(
     input_path: str,
     output_path: str,
     noise_threshold: str = "-30dB",
     min_silence_duration: float = 0.5,
-    padding: float = 0.1
+    padding: float = 0.1,
+    preview_dir: Optional[str] = None,
+    thumbnail_interval: float = 2.0,
+    stop: Optional[threading.Event] = None
 ) -> dict:
     """
     Remove silent portions from a video file.
@@ -90,23 +169,61 @@ def remove_silence(
         noise_threshold: Audio level below which is considered silence
         min_silence_duration: Minimum duration of silence to remove
         padding: Keep this much silence at the edges (seconds)
+        preview_dir: If set, also generate waveform peaks and a thumbnail
+                     sprite here, reusing the detection and render decodes
+        thumbnail_interval: Seconds between thumbnails in the sprite
+        stop: Event to cancel from another thread; the running FFmpeg
+              process is killed
 
     Returns:
         Dictionary with processing results
+
+    Raises:
+        SilenceRemovalCancelled: If `stop` was set
     """
-    # Detect silence
-    silence_periods = detect_silence(input_path, noise_threshold, min_silence_duration)
+    audio = has_audio(input_path)
+
+    pcm_path = None
+    if preview_dir:
+        os.makedirs(preview_dir, exist_ok=True)
+        if audio:
+            pcm_path = os.path.join(preview_dir, "audio.pcm")
+
+    # Detect silence (a video without audio has nothing to cut)
+    silence_periods = []
+    if audio:
+        try:
+            silence_periods = detect_silence(
+                input_path, noise_threshold, min_silence_duration, pcm_output=pcm_path, stop=stop
+            )
+        except RuntimeError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
 
     if not silence_periods:
         # No silence detected, just copy the file
         subprocess.run(["cp", input_path, output_path])
-        return {
+        duration = get_video_duration(input_path)
+        result = {
             "success": True,
             "silence_removed": 0,
-            "original_duration": get_video_duration(input_path),
-            "new_duration": get_video_duration(input_path)
+            "original_duration": duration,
+            "new_duration": duration
         }
 
+        if preview_dir:
+            # Nothing is rendered, so thumbnails need their own decode
+            interval = preview_generator.thumbnail_interval(thumbnail_interval, duration)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                thumbnails = extract_thumbnails(input_path, temp_dir, duration, interval, stop=stop)
+                result["preview"] = preview_generator.generate_previews(
+                    pcm_path, thumbnails, preview_dir, duration, interval
+                )
+
+        return result
+
     # Get video duration
     total_duration = get_video_duration(input_path)
 
@@ -133,9 +250,14 @@ def remove_silence(
             "error": "No non-silent segments found"
         }
 
+    kept_duration = sum(end - start for start, end in non_silent_segments)
+    interval = preview_generator.thumbnail_interval(thumbnail_interval, kept_duration)
+
     # Create filter complex for concatenation
     with tempfile.TemporaryDirectory() as temp_dir:
         segment_files = []
+        thumbnails = []
+        offset = 0.0
 
         # Extract each non-silent segment
         for i, (start, end) in enumerate(non_silent_segments):
@@ -151,9 +273,34 @@ def remove_silence(
                 "-avoid_negative_ts", "make_zero",
                 segment_path
             ]
-            subprocess.run(cmd, capture_output=True)
+
+            if preview_dir:
+                # Second output on the same decode: thumbnails on the output timeline
+                thumb_pattern = os.path.join(temp_dir, f"thumb_{i}_%05d.jpg")
+                cmd.extend(preview_generator.thumbnail_output_args(
+                    thumb_pattern, start, end, offset, interval, include_first=i == 0
+                ))
+
+            result = run_ffmpeg(cmd, stop)
+            if result.returncode != 0 and preview_dir:
+                # Don't let the thumbnail output break the render: retry without it
+                cmd = cmd[:cmd.index(segment_path) + 1]
+                result = run_ffmpeg(cmd, stop)
+            if result.returncode != 0:
+                return {
+                    "success": False,
+                    "error": f"Failed to render segment {i}: {result.stderr.strip()[-500:]}"
+                }
             segment_files.append(segment_path)
 
+            if preview_dir:
+                times = preview_generator.parse_thumbnail_times(result.stderr)
+                thumbnails.extend(
+                    (offset + time, os.path.join(temp_dir, f"thumb_{i}_{n:05d}.jpg"))
+                    for n, time in enumerate(times, 1)
+                )
+            offset += end - start
+
         # Create concat file
         concat_file = os.path.join(temp_dir, "concat.txt")
         with open(concat_file, "w") as f:
@@ -170,12 +317,19 @@ def remove_silence(
             "-c", "copy",
             output_path
         ]
-        subprocess.run(cmd, capture_output=True)
+        run_ffmpeg(cmd, stop)
+
+        new_duration = get_video_duration(output_path)
+
+        preview = None
+        if preview_dir:
+            preview = preview_generator.generate_previews(
+                pcm_path, thumbnails, preview_dir, new_duration, interval, segments=non_silent_segments
+            )
 
-    new_duration = get_video_duration(output_path)
     silence_removed = total_duration - new_duration
 
-    return {
+    result = {
         "success": True,
         "silence_periods": len(silence_periods),
         "silence_removed": round(silence_removed, 2),
@@ -183,6 +337,9 @@ def remove_silence(
         "new_duration": round(new_duration, 2),
         "reduction_percent": round((silence_removed / total_duration) * 100, 1)
     }
+    if preview is not None:
+        result["preview"] = preview
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,413 @@
+"""
+Transcription Backends
+Pluggable speech-to-text engines used by the caption generator
+
+Every backend shares the same request pipeline:
+- a token bucket limiter tuned to the provider's requests-per-minute quota
+- a concurrency cap on in-flight requests
+- jittered exponential retries (honouring Retry-After on 429s)
+- request hedging: a slow call gets a duplicate and the first answer wins
+
+Backends:
+- openai: OpenAI Whisper API through one shared async client
+- stub: deterministic local engine for offline benchmarks and tests
+"""
+
+import os
+import random
+import asyncio
+import hashlib
+import time
+from typing import Optional
+
+from openai import (
+    AsyncOpenAI,
+    APIError,
+    APIConnectionError,
+    APIStatusError,
+    InternalServerError,
+    RateLimitError,
+)
+
+
+class TranscriptionError(Exception):
+    """Raised when a transcription request fails."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Async token bucket limiting how often requests may start.
+
+    Tokens refill at `rate` per second up to `capacity`. Callers that find
+    the bucket empty reserve a future token, so waiters are served in order
+    without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may start."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds` (e.g. after a 429 with Retry-After)."""
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class TranscriptionBackend:
+    """
+    Base class for transcription engines.
+
+    Subclasses implement `_transcribe` and `_translate`, returning a dict with
+    `language`, `text` and `segments` (each segment has `start`, `end`, `text`).
+    Retryable failures must be raised as TranscriptionError(retryable=True).
+    """
+
+    name = "base"
+
+    def __init__(
+        self,
+        rpm: float = 50,
+        burst: int = 5,
+        max_concurrency: int = 4,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        hedge_after: float = 0.0
+    ):
+        self.limiter = TokenBucket(rate=rpm / 60.0, capacity=burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = {"requests": 0, "retries": 0, "hedges": 0, "rate_limited": 0}
+
+    async def transcribe(self, audio_path: str, language: Optional[str] = None) -> dict:
+        """Transcribe an audio file. If language is None, it is auto-detected."""
+        return await self._call(self._transcribe, audio_path, language)
+
+    async def translate(self, audio_path: str) -> dict:
+        """Transcribe an audio file and translate it to English."""
+        return await self._call(self._translate, audio_path)
+
+    async def aclose(self) -> None:
+        """Release any shared resources held by the backend."""
+        pass
+
+    async def _transcribe(self, audio_path: str, language: Optional[str]) -> dict:
+        raise NotImplementedError
+
+    async def _translate(self, audio_path: str) -> dict:
+        raise NotImplementedError
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _call(self, fn, *args) -> dict:
+        attempt = 0
+        while True:
+            try:
+                return await self._hedged(fn, *args)
+            except TranscriptionError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+
+                if e.retry_after is not None:
+                    self.stats["rate_limited"] += 1
+                    self.limiter.pause(e.retry_after)
+                    delay = e.retry_after + random.uniform(0, self.backoff_base)
+                else:
+                    delay = self._backoff(attempt)
+
+                attempt += 1
+                self.stats["retries"] += 1
+                print(f"Transcription attempt {attempt} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, fn, *args) -> dict:
+        async with self._semaphore:
+            await self.limiter.acquire()
+            self.stats["requests"] += 1
+            return await fn(*args)
+
+    async def _hedged(self, fn, *args) -> dict:
+        if not self.hedge_after:
+            return await self._attempt(fn, *args)
+
+        pending = {asyncio.ensure_future(self._attempt(fn, *args))}
+        error = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                # Primary is slow: race a duplicate request against it
+                self.stats["hedges"] += 1
+                pending.add(asyncio.ensure_future(self._attempt(fn, *args)))
+
+            while True:
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            raise error or TranscriptionError("Transcription request was cancelled")
+        finally:
+            # Also reached when the caller is cancelled: don't orphan requests
+            for task in pending:
+                task.cancel()
+
+
+class OpenAIBackend(TranscriptionBackend):
+    """OpenAI Whisper API backend using a single shared async client."""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str = "whisper-1", timeout: float = 300.0, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+        # Retries are handled by the backend so they go through the limiter
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0, timeout=timeout)
+
+    async def _transcribe(self, audio_path: str, language: Optional[str]) -> dict:
+        options = {
+            "model": self.model,
+            "response_format": "verbose_json",
+            "timestamp_granularities": ["segment"]
+        }
+        if language:
+            options["language"] = language
+
+        with open(audio_path, "rb") as audio_file:
+            try:
+                result = await self.client.audio.transcriptions.create(file=audio_file, **options)
+            except APIError as e:
+                raise self._wrap_error(e) from e
+
+        return result.model_dump()
+
+    async def _translate(self, audio_path: str) -> dict:
+        with open(audio_path, "rb") as audio_file:
+            try:
+                result = await self.client.audio.translations.create(
+                    model=self.model,
+                    file=audio_file,
+                    response_format="verbose_json"
+                )
+            except APIError as e:
+                raise self._wrap_error(e) from e
+
+        return result.model_dump()
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+    @staticmethod
+    def _retry_after(e: APIStatusError) -> Optional[float]:
+        headers = e.response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
+    def _wrap_error(self, e: APIError) -> TranscriptionError:
+        if isinstance(e, RateLimitError):
+            # Exhausted billing quota is also a 429 but will not recover on retry
+            if getattr(e, "code", None) == "insufficient_quota":
+                return TranscriptionError(str(e))
+            return TranscriptionError(str(e), retryable=True, retry_after=self._retry_after(e))
+        if isinstance(e, (APIConnectionError, InternalServerError)):
+            return TranscriptionError(str(e), retryable=True)
+        if isinstance(e, APIStatusError) and e.status_code in (408, 409):
+            return TranscriptionError(str(e), retryable=True, retry_after=self._retry_after(e))
+        return TranscriptionError(str(e))
+
+
+class StubBackend(TranscriptionBackend):
+    """
+    Deterministic local backend.
+
+    Output depends only on the audio bytes, and latency/errors come from a
+    seeded RNG, so runs are reproducible offline. Injected errors look like
+    provider 429s so retry and limiter behaviour can be benchmarked.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        language: str = "en",
+        seed: int = 0,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.language = language
+        self._rng = random.Random(seed)
+
+    async def _transcribe(self, audio_path: str, language: Optional[str]) -> dict:
+        return await self._fake_result(audio_path, language or self.language, "")
+
+    async def _translate(self, audio_path: str) -> dict:
+        return await self._fake_result(audio_path, "en", "[en] ")
+
+    async def _fake_result(self, audio_path: str, language: str, prefix: str) -> dict:
+        with open(audio_path, "rb") as f:
+            data = f.read()
+
+        await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        if self._rng.random() < self.error_rate:
+            raise TranscriptionError("Stub backend: rate limit exceeded", retryable=True, retry_after=self.retry_after)
+
+        return stub_transcript(data, language, prefix)
+
+
+def stub_transcript(data: bytes, language: str, prefix: str = "") -> dict:
+    """Build a deterministic verbose_json-style transcript for some audio bytes."""
+    digest = hashlib.sha256(data).hexdigest()[:8]
+
+    # Roughly the size of 16kHz mono mp3 audio per second
+    duration = max(1.0, len(data) / 8000)
+    segments = []
+    start = 0.0
+    while start < duration:
+        end = min(duration, start + 4.0)
+        segments.append({
+            "id": len(segments),
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "text": f" {prefix}Segment {len(segments) + 1} of {digest}"
+        })
+        start = end
+
+    return {
+        "language": language,
+        "duration": round(duration, 2),
+        "text": "".join(s["text"] for s in segments).strip(),
+        "segments": segments
+    }
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def create_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    """Create a backend configured from environment variables."""
+    name = name or os.getenv("TRANSCRIPTION_BACKEND", "openai")
+    # The limiter is per process: split the quota between the processes sharing it
+    processes = max(1, int(_env_float("TRANSCRIPTION_PROCESSES", 1)))
+    common = {
+        "rpm": _env_float("TRANSCRIPTION_RPM", 50) / processes,
+        "burst": max(1, int(_env_float("TRANSCRIPTION_BURST", 5)) // processes),
+        "max_concurrency": int(_env_float("TRANSCRIPTION_MAX_CONCURRENCY", 4)),
+        "max_retries": int(_env_float("TRANSCRIPTION_MAX_RETRIES", 4)),
+        "hedge_after": _env_float("TRANSCRIPTION_HEDGE_AFTER", 0)
+    }
+
+    if name == "stub":
+        retry_after = os.getenv("STUB_TRANSCRIPTION_RETRY_AFTER")
+        return StubBackend(
+            latency=_env_float("STUB_TRANSCRIPTION_LATENCY", 0.5),
+            jitter=_env_float("STUB_TRANSCRIPTION_JITTER", 0),
+            error_rate=_env_float("STUB_TRANSCRIPTION_ERROR_RATE", 0),
+            retry_after=float(retry_after) if retry_after else None,
+            language=os.getenv("STUB_TRANSCRIPTION_LANGUAGE", "en"),
+            seed=int(_env_float("STUB_TRANSCRIPTION_SEED", 0)),
+            **common
+        )
+
+    if name == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise TranscriptionError("OPENAI_API_KEY environment variable not set")
+        return OpenAIBackend(api_key, **common)
+
+    raise TranscriptionError(f"Unknown transcription backend: {name}")
+
+
+# Shared backend for the server process (created lazily inside the event loop)
+_backend: Optional[TranscriptionBackend] = None
+
+
+def get_backend() -> TranscriptionBackend:
+    """Return the process-wide backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+async def close_backend() -> None:
+    """Close the process-wide backend, if one was created."""
+    global _backend
+    if _backend is not None:
+        await _backend.aclose()
+        _backend = None
+
+
+async def _benchmark(audio_path: str, requests: int) -> dict:
+    backend = create_backend("stub")
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(backend.transcribe(audio_path) for _ in range(requests)),
+        return_exceptions=True
+    )
+    elapsed = time.monotonic() - started
+    failures = sum(1 for r in results if isinstance(r, Exception))
+    return {
+        "requests": requests,
+        "failures": failures,
+        "elapsed": round(elapsed, 2),
+        "throughput_per_min": round((requests - failures) / elapsed * 60, 1),
+        **backend.stats
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python transcription.py <audio_file> [requests]")
+        print("Benchmarks the stub backend; configure it with TRANSCRIPTION_* and STUB_TRANSCRIPTION_* variables")
+        sys.exit(1)
+
+    audio_file = sys.argv[1]
+    request_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    result = asyncio.run(_benchmark(audio_file, request_count))
+    print(f"Result: {result}")
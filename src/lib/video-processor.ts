@@ -11,6 +11,8 @@ export interface ProcessingOptions {
   noise_threshold?: string  // e.g., "-30dB"
   min_silence_duration?: number  // seconds
   whisper_model?: 'tiny' | 'base' | 'small' | 'medium' | 'large'
+  previews?: boolean  // generate waveform peaks and a thumbnail sprite
+  thumbnail_interval?: number  // seconds between sprite thumbnails
 }
 
 export interface ProcessingJob {
@@ -31,6 +33,11 @@ export interface ProcessingJob {
       language: string
       segment_count: number
     }
+    previews?: {
+      waveform_url?: string  // multi-resolution min/max peaks (JSON)
+      sprite_url?: string  // JPEG thumbnail sprite sheet
+      thumbnails_url?: string  // WebVTT index into the sprite (#xywh=)
+    }
   }
 }
 